@@ -8,81 +8,220 @@ Use this to reset or acknowledge alerts as needed.
 """
 
 import argparse
+import atexit
 import sqlite3
 from datetime import datetime
 from typing import Optional
 import sys
 
+# Row template for list_alerts, parsed once; the width.precision specs
+# ({:<20.20}) truncate-and-pad inside the C formatter instead of slicing
+# a new string per row
+_ROW_FMT = "{:<12} | {:<20.20} | {:<25.25} | {:>8.2f} | {:>8.2f} | {:>5.1f}% | {:<15}"
+
 
 class AlertManager:
     """Manage alert flags in the energy data database."""
-    
+
+    # Tracks whether the status index has been ensured for this process
+    _index_ensured = False
+
+    # Parameterized SQL hoisted to class scope so every call reuses the
+    # same statement text (and thus the connection's statement cache)
+    # The status string is derived in SQL so the per-row Python loop
+    # has no branches left, only formatting
+    _Q_LIST_BASE = '''
+        SELECT 
+            date,
+            pod_code,
+            pod_name,
+            value_kwh,
+            expected_kwh,
+            performance_ratio,
+            CASE
+                WHEN alert_acknowledged = 1 THEN 'Acknowledged'
+                WHEN alert_sent = 1 THEN 'Sent'
+                ELSE 'Pending'
+            END AS status_str
+        FROM energy_data
+        WHERE is_underperforming = 1
+    '''
+
+    # Fully-formed query per status value so repeat calls always hit
+    # the same statement text in SQLite's cache; LIMIT is always bound
+    # (-1 means unlimited) to keep the text identical
+    _LIST_QUERIES = {
+        'all': _Q_LIST_BASE
+               + ' ORDER BY date DESC, pod_name LIMIT ?',
+        'pending': _Q_LIST_BASE
+                   + ' AND alert_sent = 0 AND alert_acknowledged = 0'
+                   + ' ORDER BY date DESC, pod_name LIMIT ?',
+        'sent': _Q_LIST_BASE
+                + ' AND alert_sent = 1 AND alert_acknowledged = 0'
+                + ' ORDER BY date DESC, pod_name LIMIT ?',
+        'acknowledged': _Q_LIST_BASE
+                        + ' AND alert_acknowledged = 1'
+                        + ' ORDER BY date DESC, pod_name LIMIT ?',
+    }
+
+    # Aggregate-only variants for --count-only; with the partial index
+    # the pending count is a single index lookup
+    _COUNT_BASE = 'SELECT COUNT(*) FROM energy_data WHERE is_underperforming = 1'
+    _COUNT_QUERIES = {
+        'all': _COUNT_BASE,
+        'pending': _COUNT_BASE + ' AND alert_sent = 0 AND alert_acknowledged = 0',
+        'sent': _COUNT_BASE + ' AND alert_sent = 1 AND alert_acknowledged = 0',
+        'acknowledged': _COUNT_BASE + ' AND alert_acknowledged = 1',
+    }
+
+    # Optional pod_code/date filters are folded into one statement via
+    # the (? IS NULL OR col = ?) pattern so SQLite caches a single plan
+    # for all four filter combinations
+    _Q_RESET = '''
+        UPDATE energy_data
+        SET alert_acknowledged = 0, alert_sent = 0
+        WHERE is_underperforming = 1
+          AND (? IS NULL OR pod_code = ?)
+          AND (? IS NULL OR date = ?)
+    '''
+
+    _Q_ACKNOWLEDGE = '''
+        UPDATE energy_data
+        SET alert_acknowledged = 1
+        WHERE is_underperforming = 1
+          AND (? IS NULL OR pod_code = ?)
+          AND (? IS NULL OR date = ?)
+    '''
+
+    _Q_STATS = '''
+        SELECT
+            COUNT(*),
+            COALESCE(SUM(CASE WHEN alert_sent = 0 AND alert_acknowledged = 0 THEN 1 ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN alert_sent = 1 AND alert_acknowledged = 0 THEN 1 ELSE 0 END), 0),
+            COALESCE(SUM(CASE WHEN alert_acknowledged = 1 THEN 1 ELSE 0 END), 0)
+        FROM energy_data
+        WHERE is_underperforming = 1
+    '''
+
     def __init__(self, db_path: str = 'energy_data_energiepark.db'):
         self.db_path = db_path
+        self._conn = None
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Lazily opened connection shared by all methods.
+
+        Keeping one connection alive preserves SQLite's page cache
+        between commands instead of rebuilding it per query."""
+        if self._conn is None:
+            self._conn = self._connect()
+            self._ensure_indexes(self._conn)
+            atexit.register(self._conn.close)
+        return self._conn
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection with WAL mode and tuned PRAGMAs.
+
+        WAL lets list/stats reads run concurrently with the bulk
+        UPDATEs in reset/acknowledge, and synchronous=NORMAL drops the
+        redundant fsync per commit."""
+        # cached_statements keeps the prepared statements for our fixed
+        # query set alive between calls, skipping the SQL re-parse.
+        # isolation_level=None leaves transaction control to us: the
+        # bulk UPDATEs open an explicit BEGIN IMMEDIATE below instead
+        # of relying on the implicit deferred transaction.
+        conn = sqlite3.connect(self.db_path, cached_statements=64,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA cache_size=-20000")
+        conn.execute("PRAGMA mmap_size=268435456")
+        return conn
+
+    def _ensure_indexes(self, conn: sqlite3.Connection):
+        """Create the composite status index once so the alert queries
+        use an index range scan instead of a full table scan."""
+        if AlertManager._index_ensured:
+            return
+
+        try:
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alerts_status
+                ON energy_data(is_underperforming, alert_sent, alert_acknowledged,
+                               date DESC, pod_name)
+            ''')
+            # Tiny partial index covering only pending alerts — the hot
+            # monitoring query — including the ORDER BY columns so the
+            # pending listing is an index-only scan without a sort
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_alerts_pending
+                ON energy_data(date DESC, pod_name)
+                WHERE is_underperforming = 1
+                  AND alert_sent = 0 AND alert_acknowledged = 0
+            ''')
+            conn.commit()
+            AlertManager._index_ensured = True
+        except sqlite3.OperationalError:
+            # Table does not exist yet (collector has not run); the
+            # individual commands will report that themselves.
+            pass
     
-    def list_alerts(self, status: str = 'all'):
+    def list_alerts(self, status: str = 'all', limit: Optional[int] = None,
+                    count_only: bool = False):
         """
         List alerts from the database.
-        
+
         Args:
             status: 'all', 'pending', 'sent', 'acknowledged'
+            limit: Optional maximum number of rows to print
+            count_only: Print only the number of matching alerts
         """
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
+
+        if count_only:
+            # Aggregate-only fast path for monitoring/cron: no row
+            # fetch, no formatting loop
+            cursor.execute(self._COUNT_QUERIES.get(status, self._COUNT_BASE))
+            print(cursor.fetchone()[0])
+            return
         
-        query = '''
-            SELECT 
-                date,
-                pod_code,
-                pod_name,
-                value_kwh,
-                expected_kwh,
-                performance_ratio,
-                alert_sent,
-                alert_acknowledged
-            FROM energy_data
-            WHERE is_underperforming = 1
-        '''
-        
-        if status == 'pending':
-            query += ' AND alert_sent = 0 AND alert_acknowledged = 0'
-        elif status == 'sent':
-            query += ' AND alert_sent = 1 AND alert_acknowledged = 0'
-        elif status == 'acknowledged':
-            query += ' AND alert_acknowledged = 1'
-        
-        query += ' ORDER BY date DESC, pod_name'
-        
-        cursor.execute(query)
-        results = cursor.fetchall()
-        conn.close()
-        
-        if not results:
+        # A negative LIMIT means "no limit" in SQLite, so the same
+        # pre-built statement serves both the limited and full listing
+        cursor.execute(self._LIST_QUERIES.get(status, self._LIST_QUERIES['all']),
+                       (limit if limit is not None else -1,))
+
+        # Stream rows straight from the cursor instead of materializing
+        # everything with fetchall(); output lines are buffered and
+        # flushed with a single write to avoid per-line stdio overhead
+        # when the listing is piped to a file or another process.
+        lines = []
+        append = lines.append  # bound once; skips the attribute lookup per row
+        count = 0
+        for row in cursor:
+            date, pod_code, pod_name, actual, expected, perf, status_str = row
+
+            if count == 0:
+                append(f"\n{'='*100}")
+                append(f"{status.upper()} ALERTS")
+                append('='*100)
+                append(f"{'Date':<12} | {'POD Code':<20} | {'Installation':<25} | "
+                       f"{'Actual':>8} | {'Expected':>8} | {'Perf%':>6} | {'Status':<15}")
+                append("-"*100)
+
+            append(_ROW_FMT.format(date, pod_code, pod_name, actual,
+                                   expected, perf * 100.0, status_str))
+            count += 1
+
+        if count == 0:
             print(f"No {status} alerts found.")
             return
-        
-        print(f"\n{'='*100}")
-        print(f"{status.upper()} ALERTS")
-        print(f"{'='*100}")
-        print(f"{'Date':<12} | {'POD Code':<20} | {'Installation':<25} | "
-              f"{'Actual':>8} | {'Expected':>8} | {'Perf%':>6} | {'Status':<15}")
-        print("-"*100)
-        
-        for row in results:
-            date, pod_code, pod_name, actual, expected, perf, sent, acked = row
-            
-            if acked:
-                status_str = "Acknowledged"
-            elif sent:
-                status_str = "Sent"
-            else:
-                status_str = "Pending"
-            
-            print(f"{date:<12} | {pod_code[:20]:<20} | {pod_name[:25]:<25} | "
-                  f"{actual:8.2f} | {expected:8.2f} | {perf*100:5.1f}% | {status_str:<15}")
-        
-        print(f"{'='*100}\n")
-        print(f"Total: {len(results)} alerts")
+
+        append(f"{'='*100}\n")
+        append(f"Total: {count} alerts")
+        sys.stdout.write("\n".join(lines) + "\n")
     
     def reset_alerts(self, pod_code: Optional[str] = None, 
                     date: Optional[str] = None,
@@ -92,48 +231,29 @@ class AlertManager:
             print("ERROR: Must use --confirm flag to reset alerts")
             return
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         
         try:
+            # Take the write lock up front so the UPDATE cannot hit
+            # SQLITE_BUSY on a mid-statement lock upgrade, and the whole
+            # operation commits with a single fsync.
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(self._Q_RESET, (pod_code, pod_code, date, date))
+            affected = cursor.rowcount
+            conn.commit()
+
             if pod_code and date:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 0, alert_sent = 0
-                    WHERE pod_code = ? AND date = ?
-                ''', (pod_code, date))
-                affected = cursor.rowcount
                 print(f"Reset alerts for POD {pod_code} on {date} ({affected} records)")
             elif pod_code:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 0, alert_sent = 0
-                    WHERE pod_code = ?
-                ''', (pod_code,))
-                affected = cursor.rowcount
                 print(f"Reset all alerts for POD {pod_code} ({affected} records)")
             elif date:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 0, alert_sent = 0
-                    WHERE date = ?
-                ''', (date,))
-                affected = cursor.rowcount
                 print(f"Reset all alerts for date {date} ({affected} records)")
             else:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 0, alert_sent = 0
-                    WHERE is_underperforming = 1
-                ''')
-                affected = cursor.rowcount
                 print(f"Reset ALL alerts ({affected} records)")
-            
-            conn.commit()
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"Error resetting alerts: {e}")
-        finally:
-            conn.close()
     
     def acknowledge_alerts(self, pod_code: Optional[str] = None,
                           date: Optional[str] = None,
@@ -143,80 +263,36 @@ class AlertManager:
             print("ERROR: Must use --confirm flag to acknowledge alerts")
             return
         
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
         
         try:
+            # Same explicit transaction handling as reset_alerts
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute(self._Q_ACKNOWLEDGE, (pod_code, pod_code, date, date))
+            affected = cursor.rowcount
+            conn.commit()
+
             if pod_code and date:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 1
-                    WHERE pod_code = ? AND date = ? AND is_underperforming = 1
-                ''', (pod_code, date))
-                affected = cursor.rowcount
                 print(f"Acknowledged alerts for POD {pod_code} on {date} ({affected} records)")
             elif pod_code:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 1
-                    WHERE pod_code = ? AND is_underperforming = 1
-                ''', (pod_code,))
-                affected = cursor.rowcount
                 print(f"Acknowledged all alerts for POD {pod_code} ({affected} records)")
             elif date:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 1
-                    WHERE date = ? AND is_underperforming = 1
-                ''', (date,))
-                affected = cursor.rowcount
                 print(f"Acknowledged all alerts for date {date} ({affected} records)")
             else:
-                cursor.execute('''
-                    UPDATE energy_data
-                    SET alert_acknowledged = 1
-                    WHERE is_underperforming = 1
-                ''')
-                affected = cursor.rowcount
                 print(f"Acknowledged ALL alerts ({affected} records)")
-            
-            conn.commit()
         except sqlite3.Error as e:
+            conn.rollback()
             print(f"Error acknowledging alerts: {e}")
-        finally:
-            conn.close()
     
     def get_statistics(self):
         """Display alert statistics."""
-        conn = sqlite3.connect(self.db_path)
+        conn = self.connection
         cursor = conn.cursor()
-        
-        # Total underperforming records
-        cursor.execute('SELECT COUNT(*) FROM energy_data WHERE is_underperforming = 1')
-        total_alerts = cursor.fetchone()[0]
-        
-        # Pending alerts
-        cursor.execute('''
-            SELECT COUNT(*) FROM energy_data 
-            WHERE is_underperforming = 1 AND alert_sent = 0 AND alert_acknowledged = 0
-        ''')
-        pending = cursor.fetchone()[0]
-        
-        # Sent alerts
-        cursor.execute('''
-            SELECT COUNT(*) FROM energy_data 
-            WHERE is_underperforming = 1 AND alert_sent = 1 AND alert_acknowledged = 0
-        ''')
-        sent = cursor.fetchone()[0]
-        
-        # Acknowledged alerts
-        cursor.execute('''
-            SELECT COUNT(*) FROM energy_data 
-            WHERE is_underperforming = 1 AND alert_acknowledged = 1
-        ''')
-        acknowledged = cursor.fetchone()[0]
-        
-        conn.close()
+
+        # Compute all four counters in a single pass over the table
+        cursor.execute(self._Q_STATS)
+        total_alerts, pending, sent, acknowledged = cursor.fetchone()
         
         print(f"\n{'='*50}")
         print("ALERT STATISTICS")
@@ -272,6 +348,14 @@ Examples:
     parser.add_argument('--date',
                        help='Date to filter by (YYYY-MM-DD)')
     
+    parser.add_argument('--limit',
+                       type=int,
+                       help='Maximum number of rows to list (for list action)')
+    
+    parser.add_argument('--count-only',
+                       action='store_true',
+                       help='Print only the number of matching alerts (for list action)')
+    
     parser.add_argument('--confirm',
                        action='store_true',
                        help='Required flag to confirm reset or acknowledge actions')
@@ -285,7 +369,7 @@ Examples:
     manager = AlertManager(args.db)
     
     if args.action == 'list':
-        manager.list_alerts(args.status)
+        manager.list_alerts(args.status, args.limit, args.count_only)
     
     elif args.action == 'reset':
         manager.reset_alerts(args.pod, args.date, args.confirm)
@@ -3,47 +3,70 @@
 Tool to retrieve geographical coordinates for locations defined in the configuration.yaml file
 @MarcDurbach 2026
 """
-import yaml
-import time
-from geopy.geocoders import Nominatim
-from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 
-# Load the YAML file
-with open('configuration_energiepark.yaml', 'r') as file:
-    data = yaml.safe_load(file)
 
-# Extract the list of pods
-pods = data['pod']
+def main():
+    # Imports live here, not at module level: PyYAML and geopy both
+    # drag in C extensions, and importing this file as a module (e.g.
+    # from tooling) should not pay that startup cost
+    import yaml
+    try:
+        # libyaml-backed loader, ~10x faster than the pure-Python one
+        from yaml import CSafeLoader as _YamlLoader
+    except ImportError:
+        from yaml import SafeLoader as _YamlLoader
+    from geopy.adapters import RequestsAdapter
+    from geopy.extra.rate_limiter import RateLimiter
+    from geopy.geocoders import Nominatim
+    from geopy.exc import GeocoderTimedOut, GeocoderUnavailable
 
-# Initialize geolocator with a unique user agent
-geolocator = Nominatim(user_agent="my_energy_app_luxembourg")
+    # Load the YAML file
+    with open('configuration_energiepark.yaml', 'r') as file:
+        data = yaml.load(file, Loader=_YamlLoader)
 
-def get_coordinates(address):
-    try:
-        location = geolocator.geocode(address, timeout=10)
-        print(f"Geocoding result for '{address}': {location}")
-        if location:
-            return location.latitude, location.longitude
-        else:
+    # Extract the list of pods
+    pods = data['pod']
+
+    # Initialize geolocator with a unique user agent. The requests-backed
+    # adapter keeps one TCP/TLS connection alive across all lookups.
+    geolocator = Nominatim(user_agent="my_energy_app_luxembourg",
+                           adapter_factory=RequestsAdapter)
+
+    # Nominatim allows 1 request/s: RateLimiter paces the calls to exactly
+    # that (instead of a conservative 3 s sleep per pod) and retries
+    # transient errors with a backoff
+    geocode = RateLimiter(geolocator.geocode, min_delay_seconds=1.0,
+                          max_retries=2)
+
+    def get_coordinates(address):
+        try:
+            location = geocode(address, timeout=10)
+            print(f"Geocoding result for '{address}': {location}")
+            if location:
+                return location.latitude, location.longitude
+            else:
+                return None, None
+        except (GeocoderTimedOut, GeocoderUnavailable) as e:
+            print(f"Error geocoding {address}: {e}")
             return None, None
-    except (GeocoderTimedOut, GeocoderUnavailable) as e:
-        print(f"Error geocoding {address}: {e}")
-        return None, None
-
-# Add coordinates to each pod, with a delay between requests
-for pod in pods:
-    print(f"Geocoding address: {pod['address']}")
-    lat, lon = get_coordinates(pod['address'])
-    pod['latitude'] = lat
-    pod['longitude'] = lon
-    time.sleep(3)  # 1 second delay between requests
-
-# Print results
-for pod in pods:
-    print(f"ID: {pod['id']}")
-    print(f"Address: {pod['address']}")
-    print(f"Latitude: {pod['latitude']}")
-    print(f"Longitude: {pod['longitude']}")
-    print(f"Price per kWh: {pod['price_per_kWh']}")
-    print(f"Peak Power: {pod['peak_power']}")
-    print("---")
+
+    # Add coordinates to each pod; RateLimiter enforces the request spacing
+    for pod in pods:
+        print(f"Geocoding address: {pod['address']}")
+        lat, lon = get_coordinates(pod['address'])
+        pod['latitude'] = lat
+        pod['longitude'] = lon
+
+    # Print results
+    for pod in pods:
+        print(f"ID: {pod['id']}")
+        print(f"Address: {pod['address']}")
+        print(f"Latitude: {pod['latitude']}")
+        print(f"Longitude: {pod['longitude']}")
+        print(f"Price per kWh: {pod['price_per_kWh']}")
+        print(f"Peak Power: {pod['peak_power']}")
+        print("---")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,13 +7,18 @@ Provides both a REST API and web interface.
 @MarcDurbach 2026
 """
 
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, ORJSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from pydantic import BaseModel, Field
 from typing import Optional, List, Literal
+import hashlib
+import queue
 import sqlite3
+import threading
+import time
 from datetime import datetime
 import os
 from contextlib import contextmanager
@@ -21,7 +26,10 @@ from contextlib import contextmanager
 app = FastAPI(
     title="Energy Alert Management API",
     description="API for managing energy data alerts and monitoring solar performance",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes 3-5x faster than the stdlib encoder, which
+    # matters for the alert lists shipped on every 30 s poll
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -32,6 +40,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+# The dashboard HTML and the alert JSON are highly repetitive (long
+# pod_code strings); gzip cuts bytes on the wire ~5-10x for clients
+# that accept it. Tiny responses are left uncompressed.
+app.add_middleware(GZipMiddleware, minimum_size=500)
 datapath="./data/"
 # Database configuration
 DB_PATH = os.getenv("DB_PATH", datapath+"energy_data_energiepark.db")
@@ -42,21 +55,21 @@ class Alert(BaseModel):
     date: str
     pod_code: str
     pod_name: str
-    value_kwh: float
-    expected_kwh: float
-    performance_ratio: float
+    value_wh: int
+    expected_wh: int
+    perf_pm: int
     alert_sent: bool
     alert_acknowledged: bool
-    
+
     class Config:
         json_schema_extra = {
             "example": {
                 "date": "2025-02-01",
-                "pod_code": "LU0000010637000000000000070232023",
+                "pod_code": "LU000001063700000000",
                 "pod_name": "Solar Installation 1",
-                "value_kwh": 45.5,
-                "expected_kwh": 60.0,
-                "performance_ratio": 0.758,
+                "value_wh": 45500,
+                "expected_wh": 60000,
+                "perf_pm": 758,
                 "alert_sent": False,
                 "alert_acknowledged": False
             }
@@ -76,500 +89,412 @@ class ActionResponse(BaseModel):
     affected_records: int
 
 
+def _new_conn() -> sqlite3.Connection:
+    """Open a tuned connection for the pool.
+
+    Long-lived connections instead of a fresh sqlite3.connect per
+    request: reopening re-parses the schema and recompiles every
+    statement from scratch, and cached_statements keeps the handful of
+    fixed queries the endpoints use permanently prepared.
+    check_same_thread=False because the handlers run on the server's
+    worker threads. isolation_level=None: autocommit, with the write
+    endpoints opening their transactions explicitly via BEGIN
+    IMMEDIATE.
+    """
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False,
+                           cached_statements=128, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    # WAL lets the GET endpoints read while the collector (or a POST
+    # here) commits, and synchronous=NORMAL drops the fsync per UPDATE;
+    # the larger cache keeps the hot index resident between requests.
+    # Matches the PRAGMAs used by the collector and alert manager.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    return conn
+
+
+# Bounded pool: enough connections for the handful of concurrent
+# dashboard requests this app sees, each opened and tuned exactly once.
+# SimpleQueue.get() blocks if all are checked out, which also caps how
+# many SQLite cursors can run at the same time.
+_POOL_SIZE = 8
+_POOL = queue.SimpleQueue()
+for _ in range(_POOL_SIZE):
+    _POOL.put(_new_conn())
+
+# Covering partial index for the alerts hot path: every endpoint
+# filters on is_underperforming = 1, and the index carries all the
+# columns get_alerts returns in its output order, so both the listing
+# (no sort, no heap fetches) and the stats aggregation run off narrow
+# index pages. ANALYZE records its selectivity for the planner.
+#
+# Run on a throwaway connection, not a pool member: the pooled
+# connections' statement caches should hold only the hot per-request
+# queries, and one-shot DDL/ANALYZE statements would just occupy
+# cache slots (and their lookaside allocations) for nothing.
+_setup_conn = sqlite3.connect(DB_PATH)
+try:
+    _setup_conn.execute('''
+        CREATE INDEX IF NOT EXISTS ix_alerts_hot
+        ON energy_data(date DESC, pod_name, pod_code,
+                       alert_sent, alert_acknowledged,
+                       value_kwh, expected_kwh, performance_ratio)
+        WHERE is_underperforming = 1
+    ''')
+    _setup_conn.execute("ANALYZE")
+    _setup_conn.commit()
+except sqlite3.OperationalError:
+    # Table not created yet (collector has not run) — queries will
+    # fail with a clear error anyway, nothing to index
+    pass
+finally:
+    _setup_conn.close()
+    del _setup_conn
+
+
 @contextmanager
 def get_db():
-    """Context manager for database connections."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    """Check a connection out of the pool for the current request."""
+    conn = _POOL.get()
     try:
         yield conn
     finally:
-        conn.close()
+        _POOL.put(conn)
+
+
+# /api/alerts/stats is polled every 30 s by every open browser tab and
+# returns identical counts between data changes. One-slot TTL cache:
+# concurrent tabs share a single scan, and the POST endpoints zero the
+# timestamp so mutations are visible on the next poll. The entry also
+# records the ETag it was computed under: if the token has moved since
+# (a collector or alert-manager commit from outside this process), the
+# cached counts are stale regardless of age and must not be served —
+# least of all under the new ETag, which would let clients 304 on the
+# stale numbers until the next data change.
+_STATS_TTL_SECONDS = 5.0
+_stats_cache = {"t": 0.0, "v": None, "etag": None}
+
+
+def _invalidate_stats_cache():
+    _stats_cache["t"] = 0.0
+
+
+# Version token for conditional GETs on the polled endpoints. SQLite's
+# PRAGMA data_version changes whenever *another* connection (the cron
+# collector, the alert manager CLI, a pooled writer here) commits to
+# the file; writes made through the checking connection itself don't
+# move it, so the local counter bumped by the POST endpoints covers
+# those. data_version is a per-connection counter, so the check is
+# pinned to one dedicated connection — pooled connections would each
+# report unrelated numbers. Between changes the token is stable and
+# idle dashboard tabs get empty 304 replies instead of the full alert
+# list every 30 seconds.
+_local_write_count = 0
+_etag_conn = _new_conn()
+_etag_lock = threading.Lock()
+
+
+def _bump_data_version():
+    global _local_write_count
+    _local_write_count += 1
+    _invalidate_stats_cache()
+
+
+def _current_etag() -> str:
+    with _etag_lock:
+        dv = _etag_conn.execute("PRAGMA data_version").fetchone()[0]
+    return f'"{dv}-{_local_write_count}"'
+
+
+# The dashboard page is a fixed document: read it once at import time,
+# pre-encode it and hand every request the same bytes object instead of
+# re-allocating and re-encoding an 11 KB string per hit. The ETag lets
+# browsers revalidate for free once their 5-minute cache expires.
+# A deployment missing the file must not kill the whole API (and the
+# container HEALTHCHECK with it) at import time, so only the dashboard
+# route errors in that case.
+_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "static", "index.html")
+try:
+    with open(_INDEX_PATH, "rb") as _f:
+        _INDEX_BYTES = _f.read()
+    _INDEX_ETAG = '"%s"' % hashlib.md5(_INDEX_BYTES).hexdigest()
+except FileNotFoundError:
+    _INDEX_BYTES = None
+    _INDEX_ETAG = None
 
 
 # API Endpoints
 @app.get("/", response_class=HTMLResponse)
-async def root():
+async def root(request: Request):
     """Serve the web interface."""
-    return """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>Energy Alert Management</title>
-        <style>
-            * { margin: 0; padding: 0; box-sizing: border-box; }
-            body {
-                font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                min-height: 100vh;
-                padding: 20px;
-            }
-            .container {
-                max-width: 1400px;
-                margin: 0 auto;
-                background: white;
-                border-radius: 12px;
-                box-shadow: 0 20px 60px rgba(0,0,0,0.3);
-                overflow: hidden;
-            }
-            header {
-                background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
-                color: white;
-                padding: 30px;
-                text-align: center;
-            }
-            h1 { font-size: 2.5em; margin-bottom: 10px; }
-            .subtitle { opacity: 0.9; font-size: 1.1em; }
-            .stats {
-                display: grid;
-                grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
-                gap: 20px;
-                padding: 30px;
-                background: #f8f9fa;
-            }
-            .stat-card {
-                background: white;
-                padding: 20px;
-                border-radius: 8px;
-                box-shadow: 0 2px 8px rgba(0,0,0,0.1);
-                text-align: center;
-            }
-            .stat-value {
-                font-size: 2.5em;
-                font-weight: bold;
-                color: #667eea;
-                margin: 10px 0;
-            }
-            .stat-label {
-                color: #666;
-                font-size: 0.9em;
-                text-transform: uppercase;
-                letter-spacing: 1px;
-            }
-            .controls {
-                padding: 30px;
-                background: white;
-                border-top: 1px solid #e0e0e0;
-            }
-            .filter-group {
-                display: flex;
-                gap: 15px;
-                margin-bottom: 20px;
-                flex-wrap: wrap;
-            }
-            select, input, button {
-                padding: 12px 20px;
-                border: 2px solid #e0e0e0;
-                border-radius: 6px;
-                font-size: 1em;
-                outline: none;
-                transition: all 0.3s;
-            }
-            select:focus, input:focus {
-                border-color: #667eea;
-            }
-            button {
-                background: #667eea;
-                color: white;
-                border: none;
-                cursor: pointer;
-                font-weight: 600;
-            }
-            button:hover {
-                background: #5568d3;
-                transform: translateY(-2px);
-                box-shadow: 0 4px 12px rgba(102, 126, 234, 0.4);
-            }
-            button.danger {
-                background: #e74c3c;
-            }
-            button.danger:hover {
-                background: #c0392b;
-            }
-            button.success {
-                background: #27ae60;
-            }
-            button.success:hover {
-                background: #229954;
-            }
-            .alerts-table {
-                padding: 30px;
-                overflow-x: auto;
-            }
-            table {
-                width: 100%;
-                border-collapse: collapse;
-                font-size: 0.95em;
-            }
-            th, td {
-                padding: 15px;
-                text-align: left;
-                border-bottom: 1px solid #e0e0e0;
-            }
-            th {
-                background: #f8f9fa;
-                font-weight: 600;
-                color: #333;
-                position: sticky;
-                top: 0;
-            }
-            tr:hover {
-                background: #f8f9fa;
-            }
-            .badge {
-                display: inline-block;
-                padding: 5px 12px;
-                border-radius: 20px;
-                font-size: 0.85em;
-                font-weight: 600;
-            }
-            .badge.pending {
-                background: #fff3cd;
-                color: #856404;
-            }
-            .badge.sent {
-                background: #d1ecf1;
-                color: #0c5460;
-            }
-            .badge.acknowledged {
-                background: #d4edda;
-                color: #155724;
-            }
-            .performance {
-                font-weight: 600;
-            }
-            .performance.low {
-                color: #e74c3c;
-            }
-            .performance.medium {
-                color: #f39c12;
-            }
-            .loading {
-                text-align: center;
-                padding: 40px;
-                color: #666;
-            }
-            .error {
-                background: #f8d7da;
-                color: #721c24;
-                padding: 15px;
-                border-radius: 6px;
-                margin: 20px;
-            }
-            .success-message {
-                background: #d4edda;
-                color: #155724;
-                padding: 15px;
-                border-radius: 6px;
-                margin: 20px;
-            }
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <header>
-                <h1>⚡ Energy Alert Management</h1>
-                <p class="subtitle">Monitor and manage solar installation performance alerts</p>
-            </header>
-            
-            <div class="stats" id="stats">
-                <div class="stat-card">
-                    <div class="stat-label">Total Alerts</div>
-                    <div class="stat-value" id="total-alerts">-</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-label">Pending</div>
-                    <div class="stat-value" id="pending-alerts">-</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-label">Sent</div>
-                    <div class="stat-value" id="sent-alerts">-</div>
-                </div>
-                <div class="stat-card">
-                    <div class="stat-label">Acknowledged</div>
-                    <div class="stat-value" id="acknowledged-alerts">-</div>
-                </div>
-            </div>
-            
-            <div class="controls">
-                <div class="filter-group">
-                    <select id="status-filter">
-                        <option value="all">All Alerts</option>
-                        <option value="pending">Pending</option>
-                        <option value="sent">Sent</option>
-                        <option value="acknowledged">Acknowledged</option>
-                    </select>
-                    <input type="date" id="date-filter" placeholder="Filter by date">
-                    <button onclick="loadAlerts()">🔍 Filter</button>
-                    <button class="success" onclick="acknowledgeAll()">✓ Acknowledge All Pending</button>
-                    <button class="danger" onclick="resetAll()">↺ Reset All</button>
-                </div>
-            </div>
-            
-            <div id="message-area"></div>
-            
-            <div class="alerts-table">
-                <table>
-                    <thead>
-                        <tr>
-                            <th>Date</th>
-                            <th>POD Code</th>
-                            <th>Installation</th>
-                            <th>Actual (kWh)</th>
-                            <th>Expected (kWh)</th>
-                            <th>Performance</th>
-                            <th>Status</th>
-                        </tr>
-                    </thead>
-                    <tbody id="alerts-body">
-                        <tr><td colspan="7" class="loading">Loading alerts...</td></tr>
-                    </tbody>
-                </table>
-            </div>
-        </div>
-        
-        <script>
-            async function loadStats() {
-                try {
-                    const response = await fetch('/api/alerts/stats');
-                    const data = await response.json();
-                    document.getElementById('total-alerts').textContent = data.total_alerts;
-                    document.getElementById('pending-alerts').textContent = data.pending;
-                    document.getElementById('sent-alerts').textContent = data.sent;
-                    document.getElementById('acknowledged-alerts').textContent = data.acknowledged;
-                } catch (error) {
-                    console.error('Error loading stats:', error);
-                }
-            }
-            
-            async function loadAlerts() {
-                const status = document.getElementById('status-filter').value;
-                const date = document.getElementById('date-filter').value;
-                
-                let url = `/api/alerts?status=${status}`;
-                if (date) url += `&date=${date}`;
-                
-                try {
-                    const response = await fetch(url);
-                    const alerts = await response.json();
-                    
-                    const tbody = document.getElementById('alerts-body');
-                    
-                    if (alerts.length === 0) {
-                        tbody.innerHTML = '<tr><td colspan="7" class="loading">No alerts found</td></tr>';
-                        return;
-                    }
-                    
-                    tbody.innerHTML = alerts.map(alert => {
-                        let statusBadge = '';
-                        if (alert.alert_acknowledged) {
-                            statusBadge = '<span class="badge acknowledged">Acknowledged</span>';
-                        } else if (alert.alert_sent) {
-                            statusBadge = '<span class="badge sent">Sent</span>';
-                        } else {
-                            statusBadge = '<span class="badge pending">Pending</span>';
-                        }
-                        
-                        const perfClass = alert.performance_ratio < 0.7 ? 'low' : 'medium';
-                        const perfPercent = (alert.performance_ratio * 100).toFixed(1);
-                        
-                        return `
-                            <tr>
-                                <td>${alert.date}</td>
-                                <td>${alert.pod_code.substring(0, 20)}...</td>
-                                <td>${alert.pod_name}</td>
-                                <td>${alert.value_kwh.toFixed(2)}</td>
-                                <td>${alert.expected_kwh.toFixed(2)}</td>
-                                <td><span class="performance ${perfClass}">${perfPercent}%</span></td>
-                                <td>${statusBadge}</td>
-                            </tr>
-                        `;
-                    }).join('');
-                } catch (error) {
-                    console.error('Error loading alerts:', error);
-                    document.getElementById('alerts-body').innerHTML = 
-                        '<tr><td colspan="7" class="error">Error loading alerts</td></tr>';
-                }
-            }
-            
-            async function acknowledgeAll() {
-                if (!confirm('Acknowledge all pending alerts?')) return;
-                
-                try {
-                    const response = await fetch('/api/alerts/acknowledge', {
-                        method: 'POST'
-                    });
-                    const data = await response.json();
-                    showMessage(data.message, 'success');
-                    loadStats();
-                    loadAlerts();
-                } catch (error) {
-                    showMessage('Error acknowledging alerts', 'error');
-                }
-            }
-            
-            async function resetAll() {
-                if (!confirm('Reset all alerts? This will allow them to be sent again.')) return;
-                
-                try {
-                    const response = await fetch('/api/alerts/reset', {
-                        method: 'POST'
-                    });
-                    const data = await response.json();
-                    showMessage(data.message, 'success');
-                    loadStats();
-                    loadAlerts();
-                } catch (error) {
-                    showMessage('Error resetting alerts', 'error');
-                }
-            }
-            
-            function showMessage(message, type) {
-                const messageArea = document.getElementById('message-area');
-                const className = type === 'success' ? 'success-message' : 'error';
-                messageArea.innerHTML = `<div class="${className}">${message}</div>`;
-                setTimeout(() => messageArea.innerHTML = '', 5000);
-            }
-            
-            // Load data on page load
-            loadStats();
-            loadAlerts();
-            
-            // Refresh every 30 seconds
-            setInterval(() => {
-                loadStats();
-                loadAlerts();
-            }, 30000);
-        </script>
-    </body>
-    </html>
+    if _INDEX_BYTES is None:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Dashboard not available: {_INDEX_PATH} missing from deployment"
+        )
+    if request.headers.get("if-none-match") == _INDEX_ETAG:
+        return Response(status_code=304)
+    return Response(
+        content=_INDEX_BYTES,
+        media_type="text/html",
+        headers={"Cache-Control": "public, max-age=300",
+                 "ETag": _INDEX_ETAG},
+    )
+
+
+# Same conditional aggregation as /api/alerts/stats, but emitted as a
+# ready JSON object so the dashboard endpoint can splice it into its
+# body without a Python round-trip
+_STATS_JSON_SQL = '''
+    SELECT json_object(
+        'total_alerts', COUNT(*),
+        'pending', COALESCE(SUM(CASE WHEN alert_sent = 0 AND alert_acknowledged = 0
+                                     THEN 1 ELSE 0 END), 0),
+        'sent', COALESCE(SUM(CASE WHEN alert_sent = 1 AND alert_acknowledged = 0
+                                  THEN 1 ELSE 0 END), 0),
+        'acknowledged', COALESCE(SUM(CASE WHEN alert_acknowledged = 1
+                                          THEN 1 ELSE 0 END), 0)
+    )
+    FROM energy_data
+    WHERE is_underperforming = 1
+'''
+
+
+_STATUS_FILTERS = {
+    'all': '',
+    'pending': ' AND alert_sent = 0 AND alert_acknowledged = 0',
+    'sent': ' AND alert_sent = 1 AND alert_acknowledged = 0',
+    'acknowledged': ' AND alert_acknowledged = 1',
+}
+
+
+def _build_alerts_sql(status: str, has_date: bool, has_pod: bool,
+                      full: bool) -> str:
+    """Bake one variant of the alerts query.
+
+    json_group_array/json_object build the final response body in
+    SQLite's C code, so no per-row Python objects are allocated at all;
+    the flag columns are mapped to real JSON booleans via
+    json('true'/'false'). The subquery keeps the ORDER BY applied
+    before aggregation. The browser table displays
+    substr(pod_code, 1, 20) anyway, so truncating in SQL saves the
+    other 13 characters per row on every poll.
     """
+    filters = _STATUS_FILTERS[status]
+    if has_date:
+        filters += ' AND date = ?'
+    if has_pod:
+        filters += ' AND pod_code = ?'
+    pod_code_expr = 'pod_code' if full else 'substr(pod_code, 1, 20)'
+
+    return f'''
+        SELECT json_group_array(json_object(
+            'date', date,
+            'pod_code', {pod_code_expr},
+            'pod_name', pod_name,
+            'value_wh', CAST(ROUND(value_kwh * 1000) AS INTEGER),
+            'expected_wh', CAST(ROUND(expected_kwh * 1000) AS INTEGER),
+            'perf_pm', CAST(performance_ratio * 1000 AS INTEGER),
+            'alert_sent', json(CASE WHEN alert_sent THEN 'true' ELSE 'false' END),
+            'alert_acknowledged', json(CASE WHEN alert_acknowledged THEN 'true' ELSE 'false' END)
+        ))
+        FROM (
+            SELECT *
+            FROM energy_data
+            WHERE is_underperforming = 1{filters}
+            ORDER BY date DESC, pod_name
+        )
+    '''
+
+
+# Every query shape fully baked at import time: the handler does one
+# dict lookup instead of rebuilding ~500 bytes of SQL per request, and
+# because each variant is always the identical string object it stays
+# pinned in the connections' prepared-statement caches
+_ALERT_QUERIES = {
+    (status, has_date, has_pod, full):
+        _build_alerts_sql(status, has_date, has_pod, full)
+    for status in _STATUS_FILTERS
+    for has_date in (False, True)
+    for has_pod in (False, True)
+    for full in (False, True)
+}
+
 
+def _alerts_json(cursor, status, date, pod_code, full) -> str:
+    """Run the filtered alerts query and return the JSON array string."""
+    sql = _ALERT_QUERIES[(status, bool(date), bool(pod_code), full)]
+    params = tuple(x for x in (date, pod_code) if x)
+    cursor.row_factory = None
+    cursor.execute(sql, params)
+    return cursor.fetchone()[0]
 
-@app.get("/api/alerts", response_model=List[Alert])
-async def get_alerts(
+
+# No response_model: the rows come straight from our own database, so
+# re-validating each one through Pydantic is pure overhead (the Alert
+# model above still documents the shape)
+# The DB endpoints are plain `def`: FastAPI runs sync handlers on its
+# threadpool, so the blocking sqlite3 calls never stall the event loop
+# (the `async def` + to_thread variant adds a hop for the same effect)
+@app.get("/api/alerts")
+def get_alerts(
+    request: Request,
     status: Literal["all", "pending", "sent", "acknowledged"] = "all",
     date: Optional[str] = None,
-    pod_code: Optional[str] = None
+    pod_code: Optional[str] = None,
+    full: bool = False
 ):
     """
     Get alerts with optional filtering.
-    
+
     - **status**: Filter by alert status (all, pending, sent, acknowledged)
     - **date**: Filter by specific date (YYYY-MM-DD)
     - **pod_code**: Filter by POD code
+    - **full**: Return untruncated POD codes (the dashboard only shows
+      the first 20 characters, so by default only those are sent)
     """
+    etag = _current_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
+    with get_db() as conn:
+        body = _alerts_json(conn.cursor(), status, date, pod_code, full)
+
+    return Response(
+        content=body,
+        media_type="application/json",
+        # no-cache = revalidate every time; fetch() then sends
+        # If-None-Match automatically and serves the cached body
+        # itself on a 304, so the dashboard JS needs no change
+        headers={"Cache-Control": "no-cache", "ETag": etag},
+    )
+
+
+@app.get("/api/dashboard")
+def get_dashboard(
+    request: Request,
+    status: Literal["all", "pending", "sent", "acknowledged"] = "all",
+    date: Optional[str] = None,
+    pod_code: Optional[str] = None,
+    full: bool = False
+):
+    """
+    Combined stats + filtered alerts for the dashboard poll.
+
+    One request instead of the /api/alerts/stats + /api/alerts pair,
+    with both queries run back-to-back in one read transaction so the
+    counts and the rows come from the same snapshot. Filter parameters
+    match /api/alerts.
+    """
+    etag = _current_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+
     with get_db() as conn:
         cursor = conn.cursor()
-        
-        query = '''
-            SELECT 
-                date,
-                pod_code,
-                pod_name,
-                value_kwh,
-                expected_kwh,
-                performance_ratio,
-                alert_sent,
-                alert_acknowledged
-            FROM energy_data
-            WHERE is_underperforming = 1
-        '''
-        params = []
-        
-        if status == 'pending':
-            query += ' AND alert_sent = 0 AND alert_acknowledged = 0'
-        elif status == 'sent':
-            query += ' AND alert_sent = 1 AND alert_acknowledged = 0'
-        elif status == 'acknowledged':
-            query += ' AND alert_acknowledged = 1'
-        
-        if date:
-            query += ' AND date = ?'
-            params.append(date)
-        
-        if pod_code:
-            query += ' AND pod_code = ?'
-            params.append(pod_code)
-        
-        query += ' ORDER BY date DESC, pod_name'
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
-        alerts = []
-        for row in rows:
-            alerts.append(Alert(
-                date=row['date'],
-                pod_code=row['pod_code'],
-                pod_name=row['pod_name'],
-                value_kwh=row['value_kwh'],
-                expected_kwh=row['expected_kwh'],
-                performance_ratio=row['performance_ratio'],
-                alert_sent=bool(row['alert_sent']),
-                alert_acknowledged=bool(row['alert_acknowledged'])
-            ))
-        
-        return alerts
-
-
-@app.get("/api/alerts/stats", response_model=AlertStats)
-async def get_alert_stats():
+        cursor.row_factory = None
+        cursor.execute("BEGIN")
+        try:
+            stats_js = cursor.execute(_STATS_JSON_SQL).fetchone()[0]
+            alerts_js = _alerts_json(cursor, status, date, pod_code, full)
+        finally:
+            conn.rollback()
+
+    return Response(
+        content='{"stats":%s,"alerts":%s}' % (stats_js, alerts_js),
+        media_type="application/json",
+        headers={"Cache-Control": "no-cache", "ETag": etag},
+    )
+
+
+# Like /api/alerts: no response_model, the counts come straight from
+# our own aggregation query and AlertStats above documents the shape
+@app.get("/api/alerts/stats")
+def get_alert_stats(request: Request, response: Response):
     """Get statistics about alerts."""
+    etag = _current_etag()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["ETag"] = etag
+
+    if (_stats_cache["etag"] == etag
+            and time.monotonic() - _stats_cache["t"] < _STATS_TTL_SECONDS):
+        return _stats_cache["v"]
+
     with get_db() as conn:
         cursor = conn.cursor()
-        
-        # Total underperforming records
-        cursor.execute('SELECT COUNT(*) as count FROM energy_data WHERE is_underperforming = 1')
-        total_alerts = cursor.fetchone()['count']
-        
-        # Pending alerts
-        cursor.execute('''
-            SELECT COUNT(*) as count FROM energy_data 
-            WHERE is_underperforming = 1 AND alert_sent = 0 AND alert_acknowledged = 0
-        ''')
-        pending = cursor.fetchone()['count']
-        
-        # Sent alerts
-        cursor.execute('''
-            SELECT COUNT(*) as count FROM energy_data 
-            WHERE is_underperforming = 1 AND alert_sent = 1 AND alert_acknowledged = 0
-        ''')
-        sent = cursor.fetchone()['count']
-        
-        # Acknowledged alerts
+
+        # One conditional-aggregation pass instead of four separate
+        # COUNT queries over the same rows
         cursor.execute('''
-            SELECT COUNT(*) as count FROM energy_data 
-            WHERE is_underperforming = 1 AND alert_acknowledged = 1
+            SELECT
+                COUNT(*) AS total_alerts,
+                COALESCE(SUM(CASE WHEN alert_sent = 0 AND alert_acknowledged = 0
+                                  THEN 1 ELSE 0 END), 0) AS pending,
+                COALESCE(SUM(CASE WHEN alert_sent = 1 AND alert_acknowledged = 0
+                                  THEN 1 ELSE 0 END), 0) AS sent,
+                COALESCE(SUM(CASE WHEN alert_acknowledged = 1
+                                  THEN 1 ELSE 0 END), 0) AS acknowledged
+            FROM energy_data
+            WHERE is_underperforming = 1
         ''')
-        acknowledged = cursor.fetchone()['count']
-        
-        return AlertStats(
-            total_alerts=total_alerts,
-            pending=pending,
-            sent=sent,
-            acknowledged=acknowledged
-        )
+        row = cursor.fetchone()
+
+        stats = {
+            'total_alerts': row['total_alerts'],
+            'pending': row['pending'],
+            'sent': row['sent'],
+            'acknowledged': row['acknowledged']
+        }
+        _stats_cache["v"] = stats
+        _stats_cache["etag"] = etag
+        _stats_cache["t"] = time.monotonic()
+        return stats
 
 
-@app.post("/api/alerts/acknowledge", response_model=ActionResponse)
-async def acknowledge_alerts(
+@app.post("/api/alerts/acknowledge")
+def acknowledge_alerts(
     pod_code: Optional[str] = None,
-    date: Optional[str] = None
+    date: Optional[str] = None,
+    pod_codes: Optional[List[str]] = Query(None)
 ):
     """
     Acknowledge alerts to prevent them from being sent.
-    
+
     - **pod_code**: Optional POD code to filter
     - **date**: Optional date to filter (YYYY-MM-DD)
+    - **pod_codes**: Optional repeated parameter selecting several PODs
+      at once (combines with **date**)
     """
     with get_db() as conn:
         cursor = conn.cursor()
-        
+
         try:
-            if pod_code and date:
+            # Grab the write lock up front instead of upgrading a read
+            # transaction mid-statement
+            cursor.execute("BEGIN IMMEDIATE")
+            if pod_codes:
+                # Whole selection in one statement and one transaction
+                # instead of a round-trip per POD
+                placeholders = ','.join('?' * len(pod_codes))
+                params = list(pod_codes)
+                sql = f'''
+                    UPDATE energy_data
+                    SET alert_acknowledged = 1
+                    WHERE pod_code IN ({placeholders})
+                      AND is_underperforming = 1
+                '''
+                if date:
+                    sql += ' AND date = ?'
+                    params.append(date)
+                cursor.execute(sql, params)
+                message = f"Acknowledged alerts for {len(pod_codes)} PODs"
+            elif pod_code and date:
                 cursor.execute('''
                     UPDATE energy_data
                     SET alert_acknowledged = 1
@@ -597,35 +522,58 @@ async def acknowledge_alerts(
                     WHERE is_underperforming = 1
                 ''')
                 message = "Acknowledged all alerts"
-            
+
             affected = cursor.rowcount
             conn.commit()
-            
-            return ActionResponse(
-                success=True,
-                message=message,
-                affected_records=affected
-            )
+            _bump_data_version()
+
+            return {
+                'success': True,
+                'message': message,
+                'affected_records': affected
+            }
         except sqlite3.Error as e:
+            conn.rollback()
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@app.post("/api/alerts/reset", response_model=ActionResponse)
-async def reset_alerts(
+@app.post("/api/alerts/reset")
+def reset_alerts(
     pod_code: Optional[str] = None,
-    date: Optional[str] = None
+    date: Optional[str] = None,
+    pod_codes: Optional[List[str]] = Query(None)
 ):
     """
     Reset alert flags to allow alerts to be sent again.
-    
+
     - **pod_code**: Optional POD code to filter
     - **date**: Optional date to filter (YYYY-MM-DD)
+    - **pod_codes**: Optional repeated parameter selecting several PODs
+      at once (combines with **date**)
     """
     with get_db() as conn:
         cursor = conn.cursor()
-        
+
         try:
-            if pod_code and date:
+            # Grab the write lock up front instead of upgrading a read
+            # transaction mid-statement
+            cursor.execute("BEGIN IMMEDIATE")
+            if pod_codes:
+                # Whole selection in one statement and one transaction
+                # instead of a round-trip per POD
+                placeholders = ','.join('?' * len(pod_codes))
+                params = list(pod_codes)
+                sql = f'''
+                    UPDATE energy_data
+                    SET alert_acknowledged = 0, alert_sent = 0
+                    WHERE pod_code IN ({placeholders})
+                '''
+                if date:
+                    sql += ' AND date = ?'
+                    params.append(date)
+                cursor.execute(sql, params)
+                message = f"Reset alerts for {len(pod_codes)} PODs"
+            elif pod_code and date:
                 cursor.execute('''
                     UPDATE energy_data
                     SET alert_acknowledged = 0, alert_sent = 0
@@ -653,16 +601,18 @@ async def reset_alerts(
                     WHERE is_underperforming = 1
                 ''')
                 message = "Reset all alerts"
-            
+
             affected = cursor.rowcount
             conn.commit()
-            
-            return ActionResponse(
-                success=True,
-                message=message,
-                affected_records=affected
-            )
+            _bump_data_version()
+
+            return {
+                'success': True,
+                'message': message,
+                'affected_records': affected
+            }
         except sqlite3.Error as e:
+            conn.rollback()
             raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 